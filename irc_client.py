@@ -1,57 +1,116 @@
 #!/usr/bin/env python3
+import os
+import selectors
 import socket
 import sys
 import logging
 import re
 import threading
-import queue
-from datetime import datetime
-from collections import defaultdict
+import time
+from collections import defaultdict, deque
+from functools import partial
+from itertools import islice
+from typing import Iterator, List, Optional, Union
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Interned copies of the commands seen most often, so parsed commands are
+# the same objects as the dispatch table keys and compare by identity
+_COMMAND_INTERN = {
+    command: sys.intern(command)
+    for command in ('PING', 'PONG', 'PRIVMSG', 'NOTICE', 'JOIN', 'PART', 'NICK',
+                    'QUIT', 'MODE', 'ERROR', 'TOPIC', 'KICK', 'INVITE')
+}
+_COMMAND_INTERN.update(
+    (f"{code:03d}", sys.intern(f"{code:03d}"))
+    for code in (1, 2, 3, 4, 5, 353, 366, 432, 433, 465, 471, 473, 474, 475)
+)
+
+def _decode(field: bytes) -> str:
+    """Decode a raw IRC field, tolerating non-UTF-8 servers."""
+    return field.decode('utf-8', 'replace')
+
+def _pop_lines(buf: bytearray, sep: bytes) -> Iterator[bytes]:
+    """Yield complete lines from buf, leaving any partial line buffered."""
+    while (end := buf.find(sep)) >= 0:
+        line = bytes(buf[:end])
+        del buf[:end + len(sep)]
+        if line:
+            yield line
+
 class IRCMessage:
-    def __init__(self, raw_message):
+    # Annotated so the parser can be compiled with mypyc
+    raw: bytes
+    prefix: str
+    nick: str
+    command: str
+    numeric: Optional[int]
+    params: List[str]
+    timestamp: float
+    # Set by the receiver: whether the message was sent by our own nick
+    is_own: bool
+
+    def __init__(self, raw_message: Union[str, bytes]) -> None:
+        # Lines from the socket arrive as bytes; only the fields are decoded
+        if isinstance(raw_message, str):
+            raw_message = raw_message.encode('utf-8')
         self.raw = raw_message.strip()
         self.prefix = ''
+        self.nick = ''
         self.command = ''
+        self.numeric = None
         self.params = []
-        self.timestamp = datetime.now()
+        self.timestamp = time.time()
+        self.is_own = False
         self.parse_message()
 
-    def parse_message(self):
-        if not self.raw:
+    def parse_message(self) -> None:
+        raw = self.raw
+        if not raw:
             return
 
-        parts = self.raw.split(' ')
-        idx = 0
+        end = len(raw)
+        pos = 0
 
         # Parse prefix if exists
-        if parts[0].startswith(':'):
-            self.prefix = parts[0][1:]
-            idx += 1
+        if raw.startswith(b':'):
+            sp = raw.find(b' ')
+            if sp < 0:
+                sp = end
+            self.prefix = _decode(raw[1:sp])
+            bang = self.prefix.find('!')
+            self.nick = self.prefix if bang < 0 else self.prefix[:bang]
+            pos = sp + 1
 
         # Parse command
-        if idx < len(parts):
-            self.command = parts[idx].upper()
-            idx += 1
+        sp = raw.find(b' ', pos)
+        if sp < 0:
+            sp = end
+        command = _decode(raw[pos:sp]).upper()
+        self.command = _COMMAND_INTERN.get(command, command)
+        # Numeric replies are always exactly three ASCII digits; isdigit()
+        # alone also accepts characters such as '²' that int() rejects
+        if len(command) == 3 and command.isascii() and command.isdigit():
+            self.numeric = int(command)
+        pos = sp + 1
 
         # Parse parameters
-        while idx < len(parts):
-            if parts[idx].startswith(':'):
+        while pos < end:
+            if raw.startswith(b':', pos):
                 # This is the last parameter, can contain spaces
-                self.params.append(' '.join(parts[idx:]).lstrip(':'))
+                self.params.append(_decode(raw[pos + 1:]))
                 break
-            else:
-                self.params.append(parts[idx])
-            idx += 1
+            sp = raw.find(b' ', pos)
+            if sp < 0:
+                sp = end
+            if sp > pos:
+                self.params.append(_decode(raw[pos:sp]))
+            pos = sp + 1
 
-    def get_nickname(self):
-        """Extract nickname from prefix."""
-        if '!' in self.prefix:
-            return self.prefix.split('!')[0]
-        return self.prefix
+    def get_nickname(self) -> str:
+        """Return the nickname extracted from the prefix."""
+        return self.nick
 
 class IRCClient:
     def __init__(self, server, port, nickname="IRCPyClient", username="ircpy", realname="IRC Python Client"):
@@ -64,18 +123,29 @@ class IRCClient:
         self.realname = realname
         self.registered = False
         self.current_channel = None
-        self.input_queue = queue.Queue()
+        self.input_queue = deque()
         self.running = False
         self.nick_attempts = 0
         self.max_nick_attempts = 5
-        self.message_history = defaultdict(list)
+        self._guest_seq = 0
         self.max_history = 100
+        self.message_history = defaultdict(lambda: deque(maxlen=self.max_history))
+        self._rbuf = bytearray()
+        self._recv_view = memoryview(bytearray(8192))
+        self._ibuf = bytearray()
+        # Serializes writes when several threads share the client (e.g. the GUI)
+        self._send_lock = threading.Lock()
         
     def connect(self):
         """Establish connection to the IRC server."""
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            logger.info(f"Connecting to {self.server}:{self.port}")
+            # IRC commands are small and latency-sensitive, so disable Nagle
+            # and give bursty server output room in the receive buffer
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
+            logger.info("Connecting to %s:%s", self.server, self.port)
             self.socket.connect((self.server, self.port))
             logger.info("Successfully connected to IRC server")
             
@@ -83,14 +153,16 @@ class IRCClient:
             self.register()
             return True
         except Exception as e:
-            logger.error(f"Failed to connect: {str(e)}")
+            logger.error("Failed to connect: %s", e)
             return False
 
     def register(self):
         """Send initial NICK and USER registration messages."""
         self.nick_attempts = 0
-        self.send_raw(f"NICK {self.nickname}")
-        self.send_raw(f"USER {self.username} 0 * :{self.realname}")
+        self.send_raw_batch([
+            f"NICK {self.nickname}",
+            f"USER {self.username} 0 * :{self.realname}",
+        ])
             
     def disconnect(self):
         """Close the connection to the IRC server."""
@@ -108,14 +180,8 @@ class IRCClient:
                 self.socket.settimeout(2.0)
                 try:
                     # Try to receive any final messages
-                    while True:
-                        data = self.receive()
-                        if not data:
-                            break
-                        messages = data.split('\r\n')
-                        for message in messages:
-                            if message:
-                                self.handle_message(message)
+                    for message in self.iter_lines():
+                        self.handle_message(message)
                 except socket.timeout:
                     pass  # Expected timeout after server closes connection
                 
@@ -128,7 +194,7 @@ class IRCClient:
                 self.socket = None
                 logger.info("Gracefully disconnected from IRC server")
             except Exception as e:
-                logger.error(f"Error during disconnect: {str(e)}")
+                logger.error("Error during disconnect: %s", e)
                 if self.socket:
                     try:
                         self.socket.close()
@@ -147,44 +213,76 @@ class IRCClient:
             
         try:
             # IRC messages are terminated with \r\n
-            full_message = f"{message}\r\n"
-            self.socket.send(full_message.encode('utf-8'))
-            logger.info(f"Sent: {message}")
+            with self._send_lock:
+                self.socket.sendall(message.encode('utf-8', 'replace') + b'\r\n')
+            logger.info("Sent: %s", message)
+            return True
+        except Exception as e:
+            logger.error("Failed to send message: %s", e)
+            return False
+
+    def send_raw_batch(self, messages):
+        """Send several raw messages to the IRC server in a single write."""
+        if not self.socket:
+            logger.error("Not connected to server")
+            return False
+
+        try:
+            data = b''.join(message.encode('utf-8', 'replace') + b'\r\n' for message in messages)
+            with self._send_lock:
+                self.socket.sendall(data)
+            for message in messages:
+                logger.info("Sent: %s", message)
             return True
         except Exception as e:
-            logger.error(f"Failed to send message: {str(e)}")
+            logger.error("Failed to send messages: %s", e)
             return False
 
     def store_message(self, target, message, from_nick=None):
         """Store message in history."""
-        timestamp = datetime.now()
         entry = {
-            'timestamp': timestamp,
+            'timestamp': time.time(),
             'from': from_nick or self.nickname,
             'message': message
         }
+        # Bounded deque drops the oldest entry once max_history is reached
         self.message_history[target].append(entry)
-        
-        # Trim history if needed
-        if len(self.message_history[target]) > self.max_history:
-            self.message_history[target] = self.message_history[target][-self.max_history:]
             
     def receive(self):
-        """Receive data from the IRC server."""
+        """Receive data from the IRC server into the read buffer."""
         if not self.socket:
             logger.error("Not connected to server")
             return None
             
         try:
-            # IRC messages are typically limited to 512 bytes
-            data = self.socket.recv(512).decode('utf-8')
-            if data:
-                return data
+            # A single read can carry many IRC lines, so read in large chunks
+            # into a preallocated buffer instead of a fresh bytes per call
+            nbytes = self.socket.recv_into(self._recv_view)
+            if nbytes:
+                self._rbuf += self._recv_view[:nbytes]
+                return nbytes
             return None
         except Exception as e:
-            logger.error(f"Failed to receive data: {str(e)}")
+            logger.error("Failed to receive data: %s", e)
             return None
 
+    def iter_lines(self):
+        """Yield complete IRC messages until the server closes the connection."""
+        while self.receive():
+            yield from self.buffered_lines()
+
+    def buffered_lines(self):
+        """Yield complete messages already received, keeping any partial line."""
+        return _pop_lines(self._rbuf, b'\r\n')
+
+    def process_incoming(self):
+        """Receive available data and handle every complete message in it."""
+        if not self.receive():
+            return False
+        for message in self.buffered_lines():
+            self.handle_message(message)
+        return True
+
     def join_channel(self, channel):
         """Join an IRC channel."""
         if not channel.startswith('#'):
@@ -212,6 +310,19 @@ class IRCClient:
         self.store_message(target, message)
         return self.send_raw(f"PRIVMSG {target} :{message}")
 
+    def send_messages(self, lines, target=None):
+        """Send several messages to the current channel or target in one write."""
+        if not target:
+            target = self.current_channel
+        if not target:
+            logger.error("No target specified and not in a channel")
+            return False
+
+        # Store messages in history
+        for line in lines:
+            self.store_message(target, line)
+        return self.send_raw_batch([f"PRIVMSG {target} :{line}" for line in lines])
+
     def send_private_message(self, target, message):
         """Send a private message to a user."""
         if not target or not message:
@@ -220,7 +331,12 @@ class IRCClient:
 
     def format_message(self, timestamp, from_nick, message, is_private=False):
         """Format a chat message for display."""
-        time_str = timestamp.strftime("%H:%M:%S")
+        # History stores epoch seconds; convert only when displaying
+        if isinstance(timestamp, (int, float)):
+            hour, minute, second = time.localtime(timestamp)[3:6]
+        else:
+            hour, minute, second = timestamp.hour, timestamp.minute, timestamp.second
+        time_str = f"{hour:02d}:{minute:02d}:{second:02d}"
         if is_private:
             return f"[{time_str}] *{from_nick}*: {message}"
         return f"[{time_str}] {from_nick}: {message}"
@@ -239,7 +355,7 @@ class IRCClient:
             return
             
         print(f"\nLast {min(count, len(messages))} messages for {target}:")
-        for msg in messages[-count:]:
+        for msg in islice(messages, max(0, len(messages) - count), None):
             is_private = not target.startswith('#')
             print(self.format_message(
                 msg['timestamp'],
@@ -248,20 +364,27 @@ class IRCClient:
                 is_private
             ))
 
-    def handle_user_input(self):
-        """Handle user input in a separate thread."""
-        print("Enter commands or messages. Type /help for available commands.")
-        while self.running:
-            try:
-                user_input = input()
-                if user_input.startswith('/'):
-                    self.handle_command(user_input[1:])
-                elif self.current_channel:
-                    self.send_message(user_input)
-                else:
-                    print("Not in a channel. Join a channel first with /join #channel")
-            except EOFError:
-                break
+    def handle_user_input(self, data):
+        """Handle a chunk of raw user input, returning False at end of input."""
+        if not data:
+            return False
+        self._ibuf += data
+        # Consecutive message lines (e.g. a paste) are sent in one write
+        pending = []
+        for line in _pop_lines(self._ibuf, b'\n'):
+            user_input = line.decode('utf-8', 'replace').rstrip('\r')
+            if user_input.startswith('/'):
+                if pending:
+                    self.send_messages(pending)
+                    pending = []
+                self.handle_command(user_input[1:])
+            elif self.current_channel:
+                pending.append(user_input)
+            else:
+                print("Not in a channel. Join a channel first with /join #channel")
+        if pending:
+            self.send_messages(pending)
+        return True
 
     def handle_command(self, command):
         """Handle IRC commands entered by the user."""
@@ -270,170 +393,244 @@ class IRCClient:
             return
 
         cmd = parts[0].lower()
-        args = parts[1:]
+        handler = self._USER_COMMANDS.get(cmd)
+        if handler:
+            handler(self, parts[1:])
+        else:
+            print(f"Unknown command: {cmd}")
 
-        if cmd == 'join':
-            if args:
-                self.join_channel(args[0])
-            else:
-                print("Usage: /join #channel")
-        elif cmd == 'part':
-            self.part_channel()
-        elif cmd == 'nick':
-            if args:
-                self.change_nickname(args[0])
+    def _command_join(self, args):
+        if args:
+            self.join_channel(args[0])
+        else:
+            print("Usage: /join #channel")
+
+    def _command_part(self, args):
+        self.part_channel()
+
+    def _command_nick(self, args):
+        if args:
+            self.change_nickname(args[0])
+        else:
+            print(f"Current nickname: {self.nickname}")
+            print("Usage: /nick new_nickname")
+
+    def _command_msg(self, args):
+        if len(args) >= 2:
+            target = args[0]
+            message = ' '.join(args[1:])
+            self.send_private_message(target, message)
+        else:
+            print("Usage: /msg <nickname> <message>")
+
+    def _command_history(self, args):
+        count = 10
+        target = None
+        if args:
+            if args[0].isdigit():
+                count = int(args[0])
             else:
-                print(f"Current nickname: {self.nickname}")
-                print("Usage: /nick new_nickname")
-        elif cmd == 'msg':
-            if len(args) >= 2:
                 target = args[0]
-                message = ' '.join(args[1:])
-                self.send_private_message(target, message)
-            else:
-                print("Usage: /msg <nickname> <message>")
-        elif cmd == 'history':
-            count = 10
-            target = None
-            if args:
-                if args[0].isdigit():
-                    count = int(args[0])
-                else:
-                    target = args[0]
-                if len(args) > 1 and args[1].isdigit():
-                    count = int(args[1])
-            self.show_history(target, count)
-        elif cmd == 'quit':
-            self.running = False
-            self.disconnect()
-        elif cmd == 'help':
-            print("Available commands:")
-            print("  /join #channel - Join a channel")
-            print("  /part - Leave current channel")
-            print("  /nick [new_nickname] - View or change nickname")
-            print("  /msg <nickname> <message> - Send private message")
-            print("  /history [target] [count] - Show message history")
-            print("  /quit - Quit the client")
-            print("  /help - Show this help message")
-        else:
-            print(f"Unknown command: {cmd}")
+            if len(args) > 1 and args[1].isdigit():
+                count = int(args[1])
+        self.show_history(target, count)
+
+    def _command_quit(self, args):
+        self.running = False
+        self.disconnect()
+
+    def _command_help(self, args):
+        print("Available commands:")
+        print("  /join #channel - Join a channel")
+        print("  /part - Leave current channel")
+        print("  /nick [new_nickname] - View or change nickname")
+        print("  /msg <nickname> <message> - Send private message")
+        print("  /history [target] [count] - Show message history")
+        print("  /quit - Quit the client")
+        print("  /help - Show this help message")
+
+    # Dispatch table for handle_command, keyed by lower-case command name
+    _USER_COMMANDS = {
+        'join': _command_join,
+        'part': _command_part,
+        'nick': _command_nick,
+        'msg': _command_msg,
+        'history': _command_history,
+        'quit': _command_quit,
+        'help': _command_help,
+    }
 
     def handle_message(self, message):
-        """Handle incoming IRC messages."""
-        irc_msg = IRCMessage(message)
+        """Handle an incoming IRC message, either a raw line or an IRCMessage."""
+        irc_msg = message if isinstance(message, IRCMessage) else IRCMessage(message)
         
         # Log the parsed message for debugging
-        logger.debug(f"Prefix: {irc_msg.prefix}, Command: {irc_msg.command}, Params: {irc_msg.params}")
+        logger.debug("Prefix: %s, Command: %s, Params: %s", irc_msg.prefix, irc_msg.command, irc_msg.params)
         
-        # Handle PING messages
-        if irc_msg.command == "PING":
-            self.send_raw(f"PONG {irc_msg.params[0]}")
-            return
-            
         # Handle numeric responses
-        if irc_msg.command.isdigit():
-            code = int(irc_msg.command)
-            if code == 1:
-                logger.info("Successfully registered with the server!")
-                self.registered = True
-            elif code == 432:  # Erroneous nickname
-                print("Error: Invalid nickname format")
-                if not self.registered:
-                    self.nickname = f"Guest{hash(self.nickname) % 1000:03d}"
-                    self.send_raw(f"NICK {self.nickname}")
-            elif code == 433:  # Nickname already in use
-                self.nick_attempts += 1
-                if self.nick_attempts < self.max_nick_attempts:
-                    new_nick = f"{self.nickname}{self.nick_attempts}"
-                    print(f"Nickname {self.nickname} already in use, trying {new_nick}")
-                    self.nickname = new_nick
-                    self.send_raw(f"NICK {self.nickname}")
-                else:
-                    print("Failed to find an available nickname")
-                    if not self.registered:
-                        self.running = False
-            elif code == 353:  # Channel names list
-                channel = irc_msg.params[2]
-                users = irc_msg.params[3].split()
-                print(f"Users in {channel}: {', '.join(users)}")
-            elif code == 465:  # You're banned
-                print("Error: You are banned from this server")
+        if irc_msg.numeric is not None:
+            handler = self._NUMERIC_HANDLERS.get(irc_msg.numeric)
+            if handler:
+                handler(self, irc_msg)
+            return
+
+        handler = self._COMMAND_HANDLERS.get(irc_msg.command)
+        if handler:
+            handler(self, irc_msg)
+        elif irc_msg.params:
+            # Print other server messages
+            print(f"{irc_msg.prefix}: {irc_msg.params[-1]}")
+
+    def _handle_ping(self, irc_msg):
+        self.send_raw(f"PONG {irc_msg.params[0]}")
+
+    def _handle_welcome(self, irc_msg):
+        logger.info("Successfully registered with the server!")
+        self.registered = True
+
+    def _handle_erroneous_nick(self, irc_msg):
+        print("Error: Invalid nickname format")
+        if not self.registered:
+            self._guest_seq += 1
+            self.nickname = f"Guest{self._guest_seq:03d}"
+            self.send_raw(f"NICK {self.nickname}")
+
+    def _handle_nick_in_use(self, irc_msg):
+        self.nick_attempts += 1
+        if self.nick_attempts < self.max_nick_attempts:
+            new_nick = f"{self.nickname}{self.nick_attempts}"
+            print(f"Nickname {self.nickname} already in use, trying {new_nick}")
+            self.nickname = new_nick
+            self.send_raw(f"NICK {self.nickname}")
+        else:
+            print("Failed to find an available nickname")
+            if not self.registered:
                 self.running = False
-            elif code == 471:  # Channel is full
-                print(f"Error: Channel {irc_msg.params[1]} is full")
-            elif code == 473:  # Channel is invite only
-                print(f"Error: Channel {irc_msg.params[1]} is invite only")
-            elif code == 474:  # Banned from channel
-                print(f"Error: You are banned from channel {irc_msg.params[1]}")
-            elif code == 475:  # Channel requires key
-                print(f"Error: Channel {irc_msg.params[1]} requires a key")
-        
-        # Handle QUIT messages
-        elif irc_msg.command == "QUIT":
-            nick = irc_msg.get_nickname()
-            quit_msg = irc_msg.params[0] if irc_msg.params else "No message"
-            if nick == self.nickname:
-                print(f"You have quit: {quit_msg}")
-            else:
-                print(f"{nick} has quit: {quit_msg}")
-        
-        # Handle ERROR messages
-        elif irc_msg.command == "ERROR":
-            error_msg = irc_msg.params[0] if irc_msg.params else "Unknown error"
-            print(f"Server error: {error_msg}")
+
+    def _handle_names(self, irc_msg):
+        channel = irc_msg.params[2]
+        users = irc_msg.params[3].split()
+        print(f"Users in {channel}: {', '.join(users)}")
+
+    def _handle_numeric_error(self, irc_msg):
+        template, fatal = self._NUMERIC_ERRORS[irc_msg.numeric]
+        channel = irc_msg.params[1] if len(irc_msg.params) > 1 else ''
+        print(f"Error: {template.format(channel=channel)}")
+        if fatal:
             self.running = False
+
+    def _handle_quit(self, irc_msg):
+        nick = irc_msg.get_nickname()
+        quit_msg = irc_msg.params[0] if irc_msg.params else "No message"
+        if nick == self.nickname:
+            print(f"You have quit: {quit_msg}")
+        else:
+            print(f"{nick} has quit: {quit_msg}")
+
+    def _handle_error(self, irc_msg):
+        error_msg = irc_msg.params[0] if irc_msg.params else "Unknown error"
+        print(f"Server error: {error_msg}")
+        self.running = False
+
+    def _handle_nick(self, irc_msg):
+        old_nick = irc_msg.get_nickname()
+        new_nick = irc_msg.params[0]
+        if old_nick == self.nickname:
+            self.nickname = new_nick
+            print(f"You are now known as {new_nick}")
+        else:
+            print(f"{old_nick} is now known as {new_nick}")
+
+    def _handle_join(self, irc_msg):
+        channel = irc_msg.params[0]
+        nick = irc_msg.get_nickname()
+        if nick == self.nickname:
+            self.current_channel = channel
+            print(f"Joined channel: {channel}")
+        else:
+            print(f"{nick} has joined {channel}")
+
+    def _handle_part(self, irc_msg):
+        channel = irc_msg.params[0]
+        nick = irc_msg.get_nickname()
+        if nick == self.nickname:
+            if channel == self.current_channel:
+                self.current_channel = None
+            print(f"Left channel: {channel}")
+        else:
+            print(f"{nick} has left {channel}")
+
+    def _handle_privmsg(self, irc_msg):
+        nick = irc_msg.get_nickname()
+        target = irc_msg.params[0]
+        message = irc_msg.params[1]
         
-        # Handle other messages (NICK, JOIN, PART, PRIVMSG)
-        elif irc_msg.command == "NICK":
-            old_nick = irc_msg.get_nickname()
-            new_nick = irc_msg.params[0]
-            if old_nick == self.nickname:
-                self.nickname = new_nick
-                print(f"You are now known as {new_nick}")
-            else:
-                print(f"{old_nick} is now known as {new_nick}")
-        
-        elif irc_msg.command == "JOIN":
-            channel = irc_msg.params[0]
-            nick = irc_msg.get_nickname()
-            if nick == self.nickname:
-                self.current_channel = channel
-                print(f"Joined channel: {channel}")
-            else:
-                print(f"{nick} has joined {channel}")
-        
-        elif irc_msg.command == "PART":
-            channel = irc_msg.params[0]
-            nick = irc_msg.get_nickname()
-            if nick == self.nickname:
-                if channel == self.current_channel:
-                    self.current_channel = None
-                print(f"Left channel: {channel}")
-            else:
-                print(f"{nick} has left {channel}")
-        
-        elif irc_msg.command == "PRIVMSG":
-            nick = irc_msg.get_nickname()
-            target = irc_msg.params[0]
-            message = irc_msg.params[1]
-            
-            # Store message in history
-            if target.startswith('#'):
-                self.store_message(target, message, nick)
-            else:
-                # For private messages, store in both sender and receiver history
-                self.store_message(nick, message, nick)
-                if target == self.nickname:
-                    print(self.format_message(datetime.now(), nick, message, True))
-                
+        # Store message in history
+        if target.startswith('#'):
+            self.store_message(target, message, nick)
+        else:
+            # For private messages, store in both sender and receiver history
+            self.store_message(nick, message, nick)
             if target == self.nickname:
-                print(f"Private message from {nick}: {message}")
-            else:
-                print(f"{nick}: {message}")
-        
-        # Print other server messages
-        elif irc_msg.params:
-            print(f"{irc_msg.prefix}: {irc_msg.params[-1]}")
+                print(self.format_message(time.time(), nick, message, True))
+            
+        if target == self.nickname:
+            print(f"Private message from {nick}: {message}")
+        else:
+            print(f"{nick}: {message}")
+
+    # Dispatch tables for handle_message, keyed by command and numeric reply
+    _COMMAND_HANDLERS = {
+        'PING': _handle_ping,
+        'QUIT': _handle_quit,
+        'ERROR': _handle_error,
+        'NICK': _handle_nick,
+        'JOIN': _handle_join,
+        'PART': _handle_part,
+        'PRIVMSG': _handle_privmsg,
+    }
+
+    _NUMERIC_HANDLERS = {
+        1: _handle_welcome,
+        353: _handle_names,            # Channel names list
+        432: _handle_erroneous_nick,   # Erroneous nickname
+        433: _handle_nick_in_use,      # Nickname already in use
+    }
+
+    # Error replies as (message template, whether the session should end)
+    _NUMERIC_ERRORS = {
+        465: ("You are banned from this server", True),
+        471: ("Channel {channel} is full", False),
+        473: ("Channel {channel} is invite only", False),
+        474: ("You are banned from channel {channel}", False),
+        475: ("Channel {channel} requires a key", False),
+    }
+    _NUMERIC_HANDLERS.update(dict.fromkeys(_NUMERIC_ERRORS, _handle_numeric_error))
+
+def _register_user_input(selector):
+    """Register stdin with selector, relaying it through a socket if needed.
+
+    The selector's data for the input key is a callable that reads the next
+    chunk of input.
+    """
+    if sys.platform != 'win32':
+        fd = sys.stdin.fileno()
+        try:
+            selector.register(fd, selectors.EVENT_READ, partial(os.read, fd, 4096))
+            return
+        except (ValueError, OSError):
+            pass  # e.g. stdin redirected from a regular file
+
+    # stdin cannot be selected here, so a reader thread forwards it
+    reader, writer = socket.socketpair()
+
+    def relay():
+        with writer:
+            for line in sys.stdin.buffer:
+                writer.sendall(line)
+
+    threading.Thread(target=relay, daemon=True).start()
+    selector.register(reader, selectors.EVENT_READ, partial(reader.recv, 4096))
 
 def main():
     # Example usage
@@ -443,34 +640,31 @@ def main():
     if client.connect():
         client.running = True
         
-        # Start input handling thread
-        input_thread = threading.Thread(target=client.handle_user_input)
-        input_thread.daemon = True
-        input_thread.start()
+        # Multiplex server traffic and user input on one thread
+        selector = selectors.DefaultSelector()
+        selector.register(client.socket, selectors.EVENT_READ)
+        _register_user_input(selector)
+        print("Enter commands or messages. Type /help for available commands.")
         
         try:
             # Message handling loop
             while client.running:
-                try:
-                    data = client.receive()
-                    if data:
-                        # Handle each complete message
-                        messages = data.split('\r\n')
-                        for message in messages:
-                            if message:  # Skip empty messages
-                                client.handle_message(message)
-                    else:  # Server closed connection
-                        print("Lost connection to server")
-                        client.running = False
-                        exit_code = 1
-                except socket.error as e:
-                    print(f"Connection error: {str(e)}")
-                    client.running = False
-                    exit_code = 1
+                for key, _ in selector.select(timeout=1.0):
+                    if key.data:
+                        if not client.handle_user_input(key.data()):
+                            selector.unregister(key.fileobj)
+                    elif not client.process_incoming():
+                        if client.running:  # Server closed connection
+                            print("Lost connection to server")
+                            client.running = False
+                            exit_code = 1
+                    if not client.running:
+                        break
         except KeyboardInterrupt:
             print("\nDisconnecting...")
         finally:
             client.running = False
+            selector.close()
             client.disconnect()
             sys.exit(exit_code)
 
@@ -2,11 +2,27 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, simpledialog
 import threading
+import asyncio
+import bisect
 from irc_client import IRCClient, IRCMessage
-from datetime import datetime
+import time
 import queue
+from collections import defaultdict, deque
+from functools import partial
+
+def _timestamp():
+    """Current local time as HH:MM:SS"""
+    t = time.localtime()
+    return f"{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
 
 class IRCGUI:
+    # Maximum number of queued messages handled per drain before yielding to Tk
+    DRAIN_BATCH_SIZE = 200
+    # Oldest chat lines are dropped beyond this to bound Text widget cost
+    MAX_CHAT_LINES = 5000
+    # Number of chat lines kept in history per channel
+    MAX_HISTORY = 2000
+
     def __init__(self, root):
         self.root = root
         self.root.title("IRC Client")
@@ -24,23 +40,41 @@ class IRCGUI:
         
         # IRC Client setup
         self.irc = None
-        self.message_queue = queue.Queue()
+        self.message_queue = queue.SimpleQueue()
         self.connected = False
+        self.receive_thread = None
+        
+        # NAMES replies are collected per channel until RPL_ENDOFNAMES,
+        # and the user list is diffed against what is currently shown
+        self._pending_names = defaultdict(list)
+        self._shown_users = {}
+        # Nicks in the order they appear in the user list
+        self._sorted_users = []
+        # Channels currently shown in the channel list (also their item ids)
+        self._channels = set()
         
         # Add message history
-        self.message_history = {}
+        self.message_history = defaultdict(partial(deque, maxlen=self.MAX_HISTORY))
         self.current_channel = None
+        # Chat lines collected while draining the queue, written in one insert,
+        # and the timestamp shared by every line in that batch
+        self._chat_batch = None
+        self._batch_timestamp = None
         
         # Create GUI elements
         self.create_menu()
         self.create_connection_frame()
-        self.create_main_interface()
+        # The main interface is built on the first successful connect
+        self._main_built = False
         
         # Bind events
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        # Start message processing
-        self.root.after(100, self.process_message_queue)
+        # Set while a queue drain or user list refresh is scheduled on the
+        # Tk thread, so bursts of work coalesce into a single callback
+        self._drain_pending = False
+        self._user_flush_pending = False
+        self._latest_users = []
 
     def create_menu(self):
         """Create the menu bar"""
@@ -83,6 +117,12 @@ class IRCGUI:
         # Connect button
         ttk.Button(self.conn_frame, text="Connect", command=self.connect).grid(row=1, column=2, columnspan=2, pady=10)
 
+    def _ensure_main_interface(self):
+        """Create the main chat interface if it has not been built yet"""
+        if not self._main_built:
+            self.create_main_interface()
+            self._main_built = True
+
     def create_main_interface(self):
         """Create the main chat interface"""
         # Channel list (left panel)
@@ -126,11 +166,8 @@ class IRCGUI:
         
         self.user_list = ttk.Treeview(self.users_frame, show="tree", selectmode="browse")
         self.user_list.grid(row=0, column=0, sticky="nsew")
-        
-        # Hide main interface initially
-        self.chat_frame.grid_remove()
-        self.channels_frame.grid_remove()
-        self.users_frame.grid_remove()
+        self.user_list.tag_configure("op", foreground="#4EC9B0")
+        self.user_list.tag_configure("voice", foreground="#569CD6")
 
     def connect(self):
         """Connect to IRC server"""
@@ -146,13 +183,22 @@ class IRCGUI:
         self.irc = IRCClient(server, port, nickname)
         if self.irc.connect():
             self.connected = True
+            self._ensure_main_interface()
+            # Drop channels left over from a previous connection
+            self.channel_list.delete(*self._channels)
+            self._channels.clear()
             self.conn_frame.grid_remove()
             self.chat_frame.grid()
             self.channels_frame.grid()
             self.users_frame.grid()
             
-            # Start message receiving thread
-            self.receive_thread = threading.Thread(target=self.receive_messages)
+            # Network reads and parsing run on an event loop in a background
+            # thread; results reach Tk through the message queue. The loop and
+            # fd are passed along so a quick reconnect cannot redirect them
+            loop = self._loop = asyncio.SelectorEventLoop()
+            fd = self._sock_fd = self.irc.socket.fileno()
+            loop.add_reader(fd, self.receive_messages, loop, fd)
+            self.receive_thread = threading.Thread(target=self._run_network_loop, args=(loop,))
             self.receive_thread.daemon = True
             self.receive_thread.start()
             
@@ -164,15 +210,21 @@ class IRCGUI:
         """Disconnect from IRC server"""
         if self.irc and self.connected:
             self.connected = False
-            self.irc.disconnect()
+            # The socket is only read on the network thread, so QUIT and the
+            # final reads happen there too
+            try:
+                self._loop.call_soon_threadsafe(self._close_connection, self._loop, self._sock_fd, self.irc)
+            except RuntimeError:
+                pass  # Loop already closed the connection after the server dropped it
             self.show_connection_frame()
             self.add_to_chat("System", "Disconnected from server")
 
     def show_connection_frame(self):
         """Show the connection dialog"""
-        self.chat_frame.grid_remove()
-        self.channels_frame.grid_remove()
-        self.users_frame.grid_remove()
+        if self._main_built:
+            self.chat_frame.grid_remove()
+            self.channels_frame.grid_remove()
+            self.users_frame.grid_remove()
         self.conn_frame.grid()
 
     def show_join_dialog(self):
@@ -222,30 +274,29 @@ class IRCGUI:
 
     def handle_command(self, command):
         """Handle IRC commands"""
-        parts = command.split()
-        if not parts:
+        cmd, _, rest = command.partition(' ')
+        if not cmd:
             return
             
-        cmd = parts[0].lower()
-        args = parts[1:]
+        cmd = cmd.lower()
+        arg, _, rest = rest.lstrip().partition(' ')
         
         if cmd == 'join':
-            if args:
-                self.irc.join_channel(args[0])
+            if arg:
+                self.irc.join_channel(arg)
             else:
                 messagebox.showinfo("Info", "Usage: /join #channel")
         elif cmd == 'part':
             self.irc.part_channel()
         elif cmd == 'nick':
-            if args:
-                self.irc.change_nickname(args[0])
+            if arg:
+                self.irc.change_nickname(arg)
             else:
                 messagebox.showinfo("Info", f"Current nickname: {self.irc.nickname}")
         elif cmd == 'msg':
-            if len(args) >= 2:
-                target = args[0]
-                message = ' '.join(args[1:])
-                self.irc.send_private_message(target, message)
+            message = rest.strip()
+            if arg and message:
+                self.irc.send_private_message(arg, message)
             else:
                 messagebox.showinfo("Info", "Usage: /msg <nickname> <message>")
         elif cmd == 'quit':
@@ -255,99 +306,201 @@ class IRCGUI:
         
         self.message_input.delete(0, tk.END)
 
-    def receive_messages(self):
-        """Receive messages from IRC server"""
-        while self.connected:
+    def _run_network_loop(self, loop):
+        """Run the network event loop until it is stopped"""
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def _close_connection(self, loop, fd, irc):
+        """Disconnect the client and end the network loop (network thread)"""
+        loop.remove_reader(fd)
+        irc.disconnect()
+        loop.stop()
+
+    def _connection_closed(self, loop, fd):
+        """Close the connection and have the Tk thread clean up (network thread)"""
+        self._close_connection(loop, fd, self.irc)
+        if self.connected:
+            self.root.after_idle(self._on_connection_lost)
+
+    def _on_connection_lost(self):
+        """Handle the server closing the connection"""
+        if self.connected:
+            self.connected = False
+            self.show_connection_frame()
+            self.add_to_chat("System", "Lost connection to server")
+
+    def receive_messages(self, loop, fd):
+        """Receive messages once the IRC socket is readable (network thread)"""
+        if not self.connected:
+            return  # disconnect() has queued the close
+        try:
+            received = self.irc.receive()
+        except Exception as e:
+            print(f"Error receiving message: {e}")
+            received = None
+        if not received:
+            self._connection_closed(loop, fd)
+            return
+        for message in self.irc.buffered_lines():
+            # Parse and do protocol bookkeeping here, off the Tk thread
             try:
-                data = self.irc.receive()
-                if data:
-                    messages = data.split('\r\n')
-                    for message in messages:
-                        if message:
-                            self.message_queue.put(message)
+                msg = IRCMessage(message)
+                # Checked before handling, which may change our nickname
+                msg.is_own = msg.nick == self.irc.nickname
+                self.irc.handle_message(msg)
+                self.message_queue.put_nowait(msg)
             except Exception as e:
-                print(f"Error receiving message: {e}")
-                self.connected = False
-                break
+                print(f"Error handling message: {e}")
+        self._schedule_drain()
+
+    def _schedule_drain(self):
+        """Have the Tk thread drain the queue, unless a drain is already pending"""
+        if not self._drain_pending:
+            self._drain_pending = True
+            self.root.after_idle(self._drain_queue)
 
-    def process_message_queue(self):
-        """Process messages from the queue"""
+    def _drain_queue(self):
+        """Process waiting messages, updating the chat display once per batch"""
+        # Cleared before reading so messages queued from now on schedule a new drain
+        self._drain_pending = False
+        self._chat_batch = []
+        self._batch_timestamp = _timestamp()
         try:
-            while True:
-                message = self.message_queue.get_nowait()
-                self.irc.handle_message(message)
-                self.update_gui_for_message(message)
-        except queue.Empty:
-            pass
+            # This is the only consumer, so qsize() messages are ready to take
+            # without paying for a queue.Empty exception at the end of each drain
+            message_queue = self.message_queue
+            get_message = message_queue.get_nowait
+            update = self.update_gui_for_message
+            for _ in range(min(message_queue.qsize(), self.DRAIN_BATCH_SIZE)):
+                try:
+                    update(get_message())
+                except Exception as e:
+                    print(f"Error updating GUI: {e}")
         finally:
-            self.root.after(100, self.process_message_queue)
+            if not self.message_queue.empty():
+                # Batch limit reached or the drain failed; let Tk redraw
+                # and handle the rest in a new drain
+                self._schedule_drain()
+            batch, self._chat_batch = self._chat_batch, None
+            self._batch_timestamp = None
+            self._write_chat(''.join(batch))
 
-    def update_gui_for_message(self, message):
-        """Update GUI based on received message"""
-        msg = IRCMessage(message)
-        
-        if msg.command == "PRIVMSG":
-            nick = msg.get_nickname()
-            target = msg.params[0]
-            content = msg.params[1]
-            
-            # Only display if it's not our own message (already displayed when sent)
-            if nick != self.irc.nickname:
-                self.add_to_chat(nick, content)
-                
-        elif msg.command == "JOIN":
-            nick = msg.get_nickname()
-            channel = msg.params[0]
-            self.add_to_chat("System", f"{nick} has joined {channel}")
-            self.update_channel_list()
-            if nick == self.irc.nickname:
-                self.current_channel = channel
-                
-        elif msg.command == "PART":
-            nick = msg.get_nickname()
-            channel = msg.params[0]
-            self.add_to_chat("System", f"{nick} has left {channel}")
-            self.update_channel_list()
-            if nick == self.irc.nickname:
-                self.current_channel = None
-                
-        elif msg.command == "NICK":
-            old_nick = msg.get_nickname()
-            new_nick = msg.params[0]
-            self.add_to_chat("System", f"{old_nick} is now known as {new_nick}")
-            
-        elif msg.command.isdigit():
-            code = int(msg.command)
-            if code == 353:  # Names list
-                channel = msg.params[2]
-                users = msg.params[3].split()
-                self.update_user_list(users)
-                self.add_to_chat("System", f"Users in {channel}: {', '.join(users)}")
+    def update_gui_for_message(self, msg):
+        """Update GUI based on a received, already parsed message"""
+        if msg.numeric is not None:
+            handler = self._NUMERIC_HANDLERS.get(msg.numeric)
+        else:
+            handler = self._COMMAND_HANDLERS.get(msg.command)
+        if handler:
+            handler(self, msg)
+
+    def _on_privmsg(self, msg):
+        # Only display if it's not our own message (already displayed when sent)
+        if not msg.is_own:
+            self.add_to_chat(msg.nick, msg.params[1])
+
+    def _on_join(self, msg):
+        nick = msg.nick
+        channel = msg.params[0]
+        self.add_to_chat("System", f"{nick} has joined {channel}")
+        if msg.is_own:
+            self.add_channel(channel)
+            self.current_channel = channel
+
+    def _on_part(self, msg):
+        nick = msg.nick
+        channel = msg.params[0]
+        self.add_to_chat("System", f"{nick} has left {channel}")
+        if msg.is_own:
+            self.remove_channel(channel)
+            self.current_channel = None
+
+    def _on_nick(self, msg):
+        self.add_to_chat("System", f"{msg.nick} is now known as {msg.params[0]}")
+
+    def _on_names(self, msg):
+        params = msg.params
+        channel = params[2]
+        users = params[3].split()
+        self._pending_names[channel].extend(users)
+        self.add_to_chat("System", f"Users in {channel}: {', '.join(users)}")
+
+    def _on_end_of_names(self, msg):
+        # The client does not handle 366, so nothing has checked it yet
+        if len(msg.params) > 1:
+            self.update_user_list(self._pending_names.pop(msg.params[1], []))
+
+    # User list tags for operator (@) and voice (+) status
+    _STATUS_TAGS = {'@': ("op",), '+': ("voice",), '': ()}
+
+    # Dispatch tables for update_gui_for_message, keyed by command and numeric reply
+    _COMMAND_HANDLERS = {
+        "PRIVMSG": _on_privmsg,
+        "JOIN": _on_join,
+        "PART": _on_part,
+        "NICK": _on_nick,
+    }
+
+    _NUMERIC_HANDLERS = {
+        353: _on_names,         # Names list
+        366: _on_end_of_names,  # End of names list
+    }
 
     def update_user_list(self, users):
-        """Update the user list in the GUI"""
-        self.user_list.delete(*self.user_list.get_children())
-        for user in sorted(users):
+        """Schedule a user list refresh; only the latest list is applied"""
+        self._latest_users = users
+        if not self._user_flush_pending:
+            self._user_flush_pending = True
+            self.root.after_idle(self._flush_users)
+
+    def _flush_users(self):
+        """Update the user list in the GUI, touching only changed entries"""
+        self._user_flush_pending = False
+        new_users = {}
+        for user in self._latest_users:
             # Handle operator status (@) and voice status (+)
             if user.startswith(('@', '+')):
-                status = user[0]
-                username = user[1:]
+                new_users[user[1:]] = user[0]
             else:
-                status = ''
-                username = user
-            self.user_list.insert("", "end", text=username, values=(status,))
+                new_users[user] = ''
+        
+        old_users = self._shown_users
+        sorted_users = self._sorted_users
+        removed = [nick for nick in old_users if nick not in new_users]
+        if removed:
+            self.user_list.delete(*removed)
+            for nick in removed:
+                del sorted_users[bisect.bisect_left(sorted_users, nick)]
+        # Insert new nicks at their sorted position instead of re-sorting the list
+        for nick in new_users.keys() - old_users.keys():
+            index = bisect.bisect_left(sorted_users, nick)
+            sorted_users.insert(index, nick)
+            self.user_list.insert("", index, iid=nick, text=nick, tags=self._STATUS_TAGS[new_users[nick]])
+        for nick in new_users.keys() & old_users.keys():
+            if new_users[nick] != old_users[nick]:
+                self.user_list.item(nick, tags=self._STATUS_TAGS[new_users[nick]])
+        self._shown_users = new_users
 
-    def update_channel_list(self):
-        """Update the channel list"""
-        if self.irc and self.irc.current_channel:
-            self.channel_list.delete(*self.channel_list.get_children())
-            self.channel_list.insert("", "end", text=self.irc.current_channel)
-            self.current_channel = self.irc.current_channel
+    def add_channel(self, channel):
+        """Add a joined channel to the channel list and select it"""
+        if channel not in self._channels:
+            self.channel_list.insert("", "end", iid=channel, text=channel)
+            self._channels.add(channel)
+        self.channel_list.selection_set(channel)
+
+    def remove_channel(self, channel):
+        """Remove a channel we have left from the channel list"""
+        if channel in self._channels:
+            self.channel_list.delete(channel)
+            self._channels.discard(channel)
 
     def add_to_chat(self, sender, message):
         """Add a message to the chat display"""
-        self.chat_display.config(state=tk.NORMAL)
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        timestamp = self._batch_timestamp or _timestamp()
         
         # Format system messages differently
         if sender == "System":
@@ -355,19 +508,29 @@ class IRCGUI:
         else:
             formatted_message = f"[{timestamp}] <{sender}> {message}\n"
             
-        self.chat_display.insert(tk.END, formatted_message)
+        if self._chat_batch is not None:
+            self._chat_batch.append(formatted_message)
+        else:
+            self._write_chat(formatted_message)
+        self._store_history(timestamp, sender, message)
+
+    def _write_chat(self, text):
+        """Append text to the chat display in a single insert"""
+        if not text:
+            return
+        self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.insert(tk.END, text)
+        # Every line ends with a newline, so the last line is always empty
+        excess = int(self.chat_display.index('end-1c').split('.')[0]) - 1 - self.MAX_CHAT_LINES
+        if excess > 0:
+            self.chat_display.delete("1.0", f"{excess + 1}.0")
         self.chat_display.see(tk.END)
         self.chat_display.config(state=tk.DISABLED)
-        
-        # Store in message history
+
+    def _store_history(self, timestamp, sender, message):
+        """Store a (timestamp, sender, message) entry in the current channel's history"""
         if self.current_channel:
-            if self.current_channel not in self.message_history:
-                self.message_history[self.current_channel] = []
-            self.message_history[self.current_channel].append({
-                'timestamp': timestamp,
-                'sender': sender,
-                'message': message
-            })
+            self.message_history[self.current_channel].append((timestamp, sender, message))
 
     def on_channel_select(self, event):
         """Handle channel selection"""
@@ -382,6 +545,10 @@ class IRCGUI:
         if self.connected:
             self.disconnect()
         self.root.destroy()
+        # Let the network thread finish sending QUIT before the process exits;
+        # joined after destroy() so it cannot block on a call into Tk
+        if self.receive_thread:
+            self.receive_thread.join()
 
 def main():
     root = tk.Tk()
@@ -20,38 +20,73 @@ class TestIRCMessage(unittest.TestCase):
         self.assertEqual(msg.command, "PRIVMSG")
         self.assertEqual(msg.params, ["#channel", "Hello World!"])
 
+    def test_parse_bytes_message(self):
+        """Test parsing a raw bytes line straight from the socket"""
+        msg = IRCMessage(b":nick!user@host PRIVMSG #channel ::) caf\xc3\xa9 \xff")
+        self.assertEqual(msg.prefix, "nick!user@host")
+        self.assertEqual(msg.command, "PRIVMSG")
+        self.assertEqual(msg.params, ["#channel", ":) caf\u00e9 \ufffd"])
+
+    def test_parse_middle_params(self):
+        """Test parsing several middle parameters without a trailing one"""
+        msg = IRCMessage(":server MODE #channel +o  nick")
+        self.assertEqual(msg.command, "MODE")
+        self.assertEqual(msg.params, ["#channel", "+o", "nick"])
+
+    def test_parse_numeric(self):
+        """Test numeric replies are recognised while parsing"""
+        self.assertEqual(IRCMessage(":server 001 nick :Welcome").numeric, 1)
+        self.assertEqual(IRCMessage(":server 433 * nick :In use").numeric, 433)
+        self.assertIsNone(IRCMessage("PING :server1").numeric)
+        # Non-ASCII digits are a command name, not a numeric
+        msg = IRCMessage(":server \u00b2\u00b2\u00b2 nick :Hi")
+        self.assertIsNone(msg.numeric)
+        self.assertEqual(msg.command, "\u00b2\u00b2\u00b2")
+
     def test_get_nickname(self):
         """Test extracting nickname from prefix"""
         msg = IRCMessage(":nick!user@host PRIVMSG #channel :Hello")
         self.assertEqual(msg.get_nickname(), "nick")
 
+        # Server prefixes have no user@host part
+        msg = IRCMessage(":irc.server.net NOTICE * :Hello")
+        self.assertEqual(msg.get_nickname(), "irc.server.net")
+
 class TestIRCClient(unittest.TestCase):
     def setUp(self):
         """Set up test fixtures"""
         self.client = IRCClient("test.server", 6667)
         self.client.socket = Mock()
 
-    def test_connect_success(self):
-        """Test successful connection"""
+    def test_connect(self):
+        """Test successful and failed connections"""
         with patch('socket.socket') as mock_socket:
-            mock_socket.return_value = Mock()
-            client = IRCClient("test.server", 6667)
-            self.assertTrue(client.connect())
-            mock_socket.return_value.connect.assert_called_once_with(("test.server", 6667))
+            with self.subTest("success"):
+                mock_socket.return_value = Mock()
+                client = IRCClient("test.server", 6667)
+                self.assertTrue(client.connect())
+                mock_socket.return_value.connect.assert_called_once_with(("test.server", 6667))
+                mock_socket.return_value.setsockopt.assert_any_call(
+                    socket.IPPROTO_TCP, socket.TCP_NODELAY, 1
+                )
 
-    def test_connect_failure(self):
-        """Test connection failure"""
-        with patch('socket.socket') as mock_socket:
-            mock_socket.return_value.connect.side_effect = socket.error()
-            client = IRCClient("test.server", 6667)
-            self.assertFalse(client.connect())
+            with self.subTest("failure"):
+                mock_socket.return_value = Mock()
+                mock_socket.return_value.connect.side_effect = socket.error()
+                client = IRCClient("test.server", 6667)
+                self.assertFalse(client.connect())
 
     def test_registration(self):
         """Test initial registration sequence"""
-        self.client.send_raw = Mock()
         self.client.register()
-        self.client.send_raw.assert_any_call("NICK IRCPyClient")
-        self.client.send_raw.assert_any_call("USER ircpy 0 * :IRC Python Client")
+        self.client.socket.sendall.assert_called_once_with(
+            b"NICK IRCPyClient\r\nUSER ircpy 0 * :IRC Python Client\r\n"
+        )
+
+    def test_send_raw(self):
+        """Test raw messages are CRLF-terminated and fully sent"""
+        self.assertTrue(self.client.send_raw("PING :test"))
+        self.client.socket.sendall.assert_called_once_with(b"PING :test\r\n")
 
     def test_join_channel(self):
         """Test joining a channel"""
@@ -97,12 +132,79 @@ class TestIRCClient(unittest.TestCase):
         self.assertEqual(history[1]['message'], "Message 2")
         self.assertEqual(history[1]['from'], "user2")
 
+    def test_message_history_limit(self):
+        """Test that history keeps only the most recent messages"""
+        channel = "#test"
+        for i in range(self.client.max_history + 5):
+            self.client.store_message(channel, f"Message {i}", "user1")
+
+        history = self.client.message_history[channel]
+        self.assertEqual(len(history), self.client.max_history)
+        self.assertEqual(history[0]['message'], "Message 5")
+        self.assertEqual(history[-1]['message'], f"Message {self.client.max_history + 4}")
+
+    def test_iter_lines_buffers_partial_messages(self):
+        """Test that lines split across reads are reassembled"""
+        chunks = iter([b"PING :a\r\nPRIVMSG #test :Hel", b"lo\r\n", b""])
+
+        def recv_into(buf):
+            data = next(chunks)
+            buf[:len(data)] = data
+            return len(data)
+
+        self.client.socket.recv_into.side_effect = recv_into
+        lines = list(self.client.iter_lines())
+        self.assertEqual(lines, [b"PING :a", b"PRIVMSG #test :Hello"])
+        self.assertEqual(self.client.socket.recv_into.call_count, 3)
+
+    def test_send_messages(self):
+        """Test several messages are sent in a single write"""
+        self.client.current_channel = "#test"
+        self.assertTrue(self.client.send_messages(["line 1", "line 2"]))
+        self.client.socket.sendall.assert_called_once_with(
+            b"PRIVMSG #test :line 1\r\nPRIVMSG #test :line 2\r\n"
+        )
+        self.assertEqual(len(self.client.message_history["#test"]), 2)
+
+    def test_handle_user_input(self):
+        """Test user input is split into complete lines"""
+        sendall = self.client.socket.sendall
+        self.client.current_channel = "#test"
+        self.assertTrue(self.client.handle_user_input(
+            b"/join #other\r\nHello there\nGeneral Kenobi\nHalf a li"
+        ))
+        self.assertEqual(sendall.call_args_list, [
+            ((b"JOIN #other\r\n",),),
+            ((b"PRIVMSG #test :Hello there\r\nPRIVMSG #test :General Kenobi\r\n",),),
+        ])
+
+        self.assertTrue(self.client.handle_user_input(b"ne\n"))
+        sendall.assert_called_with(b"PRIVMSG #test :Half a line\r\n")
+        self.assertFalse(self.client.handle_user_input(b""))
+
+    def test_handle_command(self):
+        """Test slash-command dispatch"""
+        self.client.send_raw = Mock()
+        self.client.handle_command("JOIN #test")
+        self.client.send_raw.assert_called_once_with("JOIN #test")
+
+        self.client.handle_command("msg user1 Hello there")
+        self.client.send_raw.assert_called_with("PRIVMSG user1 :Hello there")
+
+        with patch('builtins.print') as mock_print:
+            self.client.handle_command("bogus")
+            mock_print.assert_called_once_with("Unknown command: bogus")
+
     def test_handle_ping(self):
         """Test PING/PONG handling"""
         self.client.send_raw = Mock()
         self.client.handle_message("PING :server1.test.net")
         self.client.send_raw.assert_called_once_with("PONG server1.test.net")
 
+        # Pre-parsed messages are handled without parsing again
+        self.client.handle_message(IRCMessage("PING :server2.test.net"))
+        self.client.send_raw.assert_called_with("PONG server2.test.net")
+
     def test_handle_nick_change(self):
         """Test nickname change handling"""
         self.client.send_raw = Mock()
@@ -128,6 +230,37 @@ class TestIRCClient(unittest.TestCase):
         self.client.handle_message(":TestUser!user@host PART :#channel")
         self.assertIsNone(self.client.current_channel)
 
+    def test_handle_numeric(self):
+        """Test numeric reply dispatch"""
+        self.client.send_raw = Mock()
+        self.client.handle_message(":server 001 IRCPyClient :Welcome")
+        self.assertTrue(self.client.registered)
+
+        self.client.handle_message(":server 433 * IRCPyClient :Nickname is already in use")
+        self.assertEqual(self.client.nickname, "IRCPyClient1")
+        self.client.send_raw.assert_called_once_with("NICK IRCPyClient1")
+
+    def test_handle_numeric_errors(self):
+        """Test error replies are reported and end the session when fatal"""
+        self.client.running = True
+        with patch('builtins.print') as mock_print:
+            self.client.handle_message(":server 471 IRCPyClient #full :Cannot join channel (+l)")
+            mock_print.assert_called_once_with("Error: Channel #full is full")
+            self.assertTrue(self.client.running)
+
+            self.client.handle_message(":server 465 IRCPyClient :You are banned")
+            mock_print.assert_called_with("Error: You are banned from this server")
+            self.assertFalse(self.client.running)
+
+    def test_handle_erroneous_nickname(self):
+        """Test fallback nicknames are generated deterministically"""
+        self.client.send_raw = Mock()
+        self.client.handle_message(":server 432 * bad!nick :Erroneous nickname")
+        self.assertEqual(self.client.nickname, "Guest001")
+        self.client.handle_message(":server 432 * Guest001 :Erroneous nickname")
+        self.assertEqual(self.client.nickname, "Guest002")
+        self.client.send_raw.assert_called_with("NICK Guest002")
+
     def test_handle_privmsg(self):
         """Test private message handling"""
         self.client.store_message = Mock()
@@ -153,6 +286,15 @@ class TestIRCClient(unittest.TestCase):
         formatted = self.client.format_message(timestamp, "User1", "Hello!", True)
         self.assertIn("*User1*: Hello!", formatted)
 
+        # Test timestamp format
+        formatted = self.client.format_message(datetime(2024, 1, 1, 9, 5, 3), "User1", "Hello!")
+        self.assertEqual(formatted, "[09:05:03] User1: Hello!")
+
+        # Test epoch timestamps as stored in history
+        timestamp = datetime(2024, 1, 1, 9, 5, 3).timestamp()
+        formatted = self.client.format_message(timestamp, "User1", "Hello!")
+        self.assertEqual(formatted, "[09:05:03] User1: Hello!")
+
 def main():
     unittest.main()
 